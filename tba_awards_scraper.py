@@ -1,9 +1,14 @@
+import array
+import contextlib
 import copy
+import cProfile
 import datetime
 import json
 import math
 import os
+import pstats
 import time
+import tracemalloc
 
 from dotenv import load_dotenv
 from jinja2 import Template
@@ -397,6 +402,151 @@ def team_summaries(team, awards):
     }
 
 
+# Number of most recent seasons covered by the rolling window summaries.
+ROLLING_WINDOW_YEARS = 5
+
+
+class AwardCube:
+    """
+    Dense team x year x award type count cube, built once per run from the
+    award details of every team.
+
+    Counts are stored in a single flat array.array so that the counts of all
+    years and award types for one team are a contiguous row, and the counts of
+    all award types for one year are a contiguous slice of that row. Only teams
+    that have received at least one award get a row.
+    """
+
+    def __init__(self, teams):
+        """
+        :param teams: Dict, keyed by team number, where each value has an
+        'awards' list like the one passed to team_summaries.
+        """
+        first_year = last_year = None
+        max_award_type = max(AwardType.HEXFECTA)
+        self.team_rows = {}
+        for team_number, team_data in teams.items():
+            if not team_data['awards']:
+                continue
+            self.team_rows[team_number] = len(self.team_rows)
+            for award in team_data['awards']:
+                if first_year is None or award['year'] < first_year:
+                    first_year = award['year']
+                if last_year is None or award['year'] > last_year:
+                    last_year = award['year']
+                max_award_type = max(max_award_type, award['award_type'])
+
+        self.first_year = first_year if first_year is not None else datetime.datetime.now().year
+        self.last_year = last_year if last_year is not None else self.first_year
+        self.num_years = self.last_year - self.first_year + 1
+        self.num_award_types = max_award_type + 1
+        self.row_size = self.num_years * self.num_award_types
+
+        self.counts = array.array('H', [0]) * (len(self.team_rows) * self.row_size)
+        for team_number, row in self.team_rows.items():
+            for award in teams[team_number]['awards']:
+                self.counts[self._offset(row, award['year']) + award['award_type']] += 1
+
+        # Slices of a memoryview share the array's memory instead of copying it.
+        self.view = memoryview(self.counts)
+        self.empty_year = memoryview(array.array('H', [0]) * self.num_award_types)
+
+    def _offset(self, row, year):
+        return row * self.row_size + (year - self.first_year) * self.num_award_types
+
+    def team_row(self, team_number):
+        """
+        Returns a memoryview of the counts of every award type a team received
+        in every year, oldest year first, or None if the team has no awards.
+        """
+        row = self.team_rows.get(team_number)
+        if row is None:
+            return None
+        offset = row * self.row_size
+        return self.view[offset:offset + self.row_size]
+
+
+def hexfecta_counts(counts, num_award_types):
+    """
+    Summarize award counts, like a row or part of a row of an AwardCube.
+    :param counts: Counts indexed by year and award type, with num_award_types
+    counts per year.
+    :return: Dict, looks like this:
+    {
+        'awards_received': 3,
+        'hexfecta_category_awards': 2,
+        'awards_by_hexfecta_category': {
+            'Engineering Excellence': 1,
+            'Quality': 1,
+            'Industrial Design': 0,
+            'Creativity': 0,
+            'Autonomous': 0,
+            'Innovation in Control': 0,
+        },
+        'hexfectas': 0,
+    }
+    """
+    awards_by_hexfecta_category = {
+        name: sum(counts[award_type::num_award_types]) for award_type, name in AwardType.HEXFECTA.items()
+    }
+    return {
+        'awards_received': sum(counts),
+        'hexfecta_category_awards': sum(awards_by_hexfecta_category.values()),
+        'awards_by_hexfecta_category': awards_by_hexfecta_category,
+        'hexfectas': min(awards_by_hexfecta_category.values()),
+    }
+
+
+def team_season_summaries(award_cube, team_number):
+    """
+    Generate the per-season summaries for a team from the award cube.
+    :return: Dict, looks like this:
+    {
+        'awards_by_year': {
+            2024: {
+                # Same keys as returned by hexfecta_counts
+            },
+            ...
+        },
+        'last_n_years': {
+            'first_year': 2021,
+            'last_year': 2025,
+            # Same keys as returned by hexfecta_counts
+        },
+    }
+    """
+    num_award_types = award_cube.num_award_types
+    first_year = award_cube.last_year - ROLLING_WINDOW_YEARS + 1
+    last_n_years = {
+        'first_year': first_year,
+        'last_year': award_cube.last_year,
+    }
+
+    row = award_cube.team_row(team_number)
+    if row is None:
+        last_n_years.update(hexfecta_counts([], num_award_types))
+        return {
+            'awards_by_year': {},
+            'last_n_years': last_n_years,
+        }
+
+    # Only years in which the team received any award are listed, newest first.
+    awards_by_year = {}
+    for year in range(award_cube.last_year, award_cube.first_year - 1, -1):
+        offset = (year - award_cube.first_year) * num_award_types
+        year_counts = row[offset:offset + num_award_types]
+        if year_counts != award_cube.empty_year:
+            awards_by_year[year] = hexfecta_counts(year_counts, num_award_types)
+
+    window_offset = max(first_year - award_cube.first_year, 0) * num_award_types
+    last_n_years.update(hexfecta_counts(row[window_offset:], num_award_types))
+
+    return {
+        'awards_by_year': awards_by_year,
+        'last_n_years': last_n_years,
+    }
+
+
 def overall_summaries(teams):
     """
     Generate the summaries object.
@@ -448,10 +598,133 @@ def overall_summaries(teams):
     }
 
 
-def scrape_and_summarize():
+class Profiler:
+    """
+    Opt-in CPU and memory profiling of the pipeline phases.
+
+    Enabled by setting the PROFILE_OUTPUT_DIR environment variable. Each phase
+    gets a cProfile profile and tracemalloc peak memory, accumulated over every
+    time the phase is entered, and written to PROFILE_OUTPUT_DIR by write() as:
+    - <phase>.pstats: raw cProfile stats, loadable with pstats
+    - <phase>.txt: peak memory, top allocators and the slowest functions
+    - summary.json: calls, time and memory of every phase
+    The text and JSON files are stable in layout so that runs can be diffed.
+
+    Phases must not be nested, since only one cProfile profile can be active.
+    """
+    TOP_ALLOCATORS = 25
+    TOP_FUNCTIONS = 50
+    # Number of calls of a sampled phase that get tracemalloc snapshots.
+    SAMPLED_CALLS = 5
+    # The profiler's own allocations are left out of the top allocators.
+    EXCLUDED_FILES = {tracemalloc.__file__, contextlib.__file__}
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir
+        self.enabled = bool(output_dir)
+        self.phases = {}
+        if self.enabled:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name, sample=False):
+        """
+        Profile the enclosed block as part of phase `name`.
+        :param sample: Whether to take tracemalloc snapshots around only the
+        first SAMPLED_CALLS calls to find the top allocators, instead of around
+        every call. Snapshots are slow, so phases entered per team sample.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        if name not in self.phases:
+            profile = cProfile.Profile()
+            # Let the profile make its first allocations before any snapshot is taken.
+            profile.enable()
+            profile.disable()
+            self.phases[name] = {
+                'profile': profile,
+                'calls': 0,
+                'seconds': 0.0,
+                'peak_memory': 0,
+                'net_memory': 0,
+                'snapshot_calls': 0,
+                'allocations': {},
+            }
+        phase = self.phases[name]
+        snapshot = not sample or phase['calls'] < self.SAMPLED_CALLS
+        before = tracemalloc.take_snapshot() if snapshot else None
+        start_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start_time = time.perf_counter()
+        phase['profile'].enable()
+        try:
+            yield
+        finally:
+            phase['profile'].disable()
+            end_time = time.perf_counter()
+            end_memory, peak_memory = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot() if snapshot else None
+            phase['calls'] += 1
+            phase['seconds'] += end_time - start_time
+            phase['peak_memory'] = max(phase['peak_memory'], peak_memory - start_memory)
+            phase['net_memory'] += end_memory - start_memory
+            if snapshot:
+                phase['snapshot_calls'] += 1
+                for stat in after.compare_to(before, 'lineno'):
+                    if stat.traceback[0].filename in self.EXCLUDED_FILES:
+                        continue
+                    size_diff, count_diff = phase['allocations'].get(stat.traceback, (0, 0))
+                    phase['allocations'][stat.traceback] = (size_diff + stat.size_diff, count_diff + stat.count_diff)
+
+    def write(self):
+        """Write the profiling artifacts of every phase to the output directory."""
+        if not self.enabled:
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = {}
+        for name, phase in self.phases.items():
+            phase['profile'].dump_stats(os.path.join(self.output_dir, f"{name}.pstats"))
+
+            with open(os.path.join(self.output_dir, f"{name}.txt"), "w") as f:
+                f.write(f"Phase: {name}\n")
+                f.write(f"Calls: {phase['calls']}\n")
+                f.write(f"Seconds: {phase['seconds']:.3f}\n")
+                f.write(f"Peak memory: {phase['peak_memory'] / 1024:.1f} KiB\n")
+                f.write(f"Net memory: {phase['net_memory'] / 1024:.1f} KiB\n")
+                f.write(f"\nTop {self.TOP_ALLOCATORS} allocators over {phase['snapshot_calls']} calls:\n")
+                top_allocators = sorted(
+                    phase['allocations'].items(), key=lambda allocation: abs(allocation[1][0]), reverse=True,
+                )[:self.TOP_ALLOCATORS]
+                for traceback, (size_diff, count_diff) in top_allocators:
+                    f.write(f"{traceback}: size={size_diff / 1024:+.1f} KiB, count={count_diff:+d}\n")
+                f.write(f"\nTop {self.TOP_FUNCTIONS} functions by cumulative time:\n")
+                stats = pstats.Stats(phase['profile'], stream=f)
+                stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.TOP_FUNCTIONS)
+
+            summary[name] = {
+                'calls': phase['calls'],
+                'seconds': phase['seconds'],
+                'peak_memory_bytes': phase['peak_memory'],
+                'net_memory_bytes': phase['net_memory'],
+            }
+
+        with open(os.path.join(self.output_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
+        tracemalloc.stop()
+        print(f"Profiling results saved to {self.output_dir}")
+
+
+def scrape_and_summarize(profiler=None):
+    if profiler is None:
+        profiler = Profiler()
     client = TBAClient()
     try:
-        client.load_from_file()
+        with profiler.phase('load_cache'):
+            client.load_from_file()
 
         # Create a list to store all teams and their award counts
         team_awards = {}
@@ -459,7 +732,8 @@ def scrape_and_summarize():
 
         print("Fetching teams...")
         while True:
-            teams, team_got_at = client.get_all_teams(page)
+            with profiler.phase('fetch', sample=True):
+                teams, team_got_at = client.get_all_teams(page)
             if not teams:  # No more teams
                 break
 
@@ -467,7 +741,8 @@ def scrape_and_summarize():
             for team in tqdm(teams):
                 team_key = team['key']
 
-                awards, awards_got_at = client.get_team_awards(team_key)
+                with profiler.phase('fetch', sample=True):
+                    awards, awards_got_at = client.get_team_awards(team_key)
 
                 if awards is not None:
                     award_details = []
@@ -479,13 +754,17 @@ def scrape_and_summarize():
                             'event_key': award['event_key'],
                         })
 
+                    rookie_year = team['rookie_year']
+                    with profiler.phase('team_summaries', sample=True):
+                        summaries = team_summaries(team, award_details)
+
                     team_awards[team['team_number']] = {
                         "team_number": team['team_number'],
                         "team_name": team['nickname'],
-                        'rookie_year': team['rookie_year'],
+                        'rookie_year': rookie_year,
                         'last_updated': awards_got_at,
                         "awards": award_details,
-                        'summaries': team_summaries(team, award_details),
+                        'summaries': summaries,
                     }
                 else:
                     print(f'Warning: Award search for team {team_key} returned None.')
@@ -496,25 +775,45 @@ def scrape_and_summarize():
             print("No team data was collected. Please check your API key and internet connection.")
             return
 
-        results = {
-            'teams': team_awards,
-            'summaries': overall_summaries(team_awards),
-            'last_updated': team_got_at,
-        }
+        # Per-season summaries are sliced from a cube built once over all teams
+        with profiler.phase('season_summaries'):
+            award_cube = AwardCube(team_awards)
+            for team_number, team_data in team_awards.items():
+                team_data['summaries'].update(team_season_summaries(award_cube, team_number))
+
+        with profiler.phase('overall_summaries'):
+            results = {
+                'teams': team_awards,
+                'summaries': overall_summaries(team_awards),
+                'last_updated': team_got_at,
+            }
 
-        with open("frc_team_awards.json", "w") as f:
-            json.dump(results, f, indent=2)
+        with profiler.phase('write_results'):
+            with open("frc_team_awards.json", "w") as f:
+                json.dump(results, f, indent=2)
 
         print("\nResults saved to frc_team_awards.csv and frc_team_awards.json")
         print(f"Processed {len(team_awards.keys())} teams")
     finally:
-        client.write_to_file()
+        with profiler.phase('write_cache'):
+            client.write_to_file()
+
 
+def write_api_json(path, data):
+    """Write a file of the static JSON API, compactly so that consumers only download a few KB per lookup."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    json_content = json.dumps(data, separators=(',', ':'))
+    with open(path, "w") as f:
+        f.write(json_content)
 
-def generate_html():
+
+def generate_html(profiler=None):
+    if profiler is None:
+        profiler = Profiler()
     print(f'Rendering HTML pages')
-    with open("frc_team_awards.json", "r") as f:
-        data = json.load(f)
+    with profiler.phase('load_results'):
+        with open("frc_team_awards.json", "r") as f:
+            data = json.load(f)
 
     # Define common components
     style_template = '''
@@ -621,6 +920,21 @@ def generate_html():
                 <li><strong>{{ category }}</strong>: {{ per_year }}</li>
             {% endfor %}
             </ul>
+            <h3>Last {{ team_data.summaries.last_n_years.last_year - team_data.summaries.last_n_years.first_year + 1 }} Years ({{ team_data.summaries.last_n_years.first_year }}-{{ team_data.summaries.last_n_years.last_year }})</h3>
+            <p><strong>Hexfectas:</strong> {{ team_data.summaries.last_n_years.hexfectas }}</p>
+            <p><strong>Awards Received:</strong> {{ team_data.summaries.last_n_years.awards_received }}</p>
+            <p><strong>Hexfecta Category Awards:</strong> {{ team_data.summaries.last_n_years.hexfecta_category_awards }}</p>
+            <ul>
+            {% for category, count in team_data.summaries.last_n_years.awards_by_hexfecta_category.items() %}
+                <li><strong>{{ category }}</strong>: {{ count }}</li>
+            {% endfor %}
+            </ul>
+            <h3>Hexfecta Category Awards by Year</h3>
+            <ul>
+            {% for year, season in team_data.summaries.awards_by_year.items() %}
+                <li><strong>{{ year }}</strong>: {{ season.hexfecta_category_awards }} of {{ season.awards_received }} awards{% for category, count in season.awards_by_hexfecta_category.items() if count %}{% if loop.first %} -- {% else %}, {% endif %}{{ category }}: {{ count }}{% endfor %}</li>
+            {% endfor %}
+            </ul>
             <h3>All Awards</h3>
             <ul>
             {% for award in team_data.awards %}
@@ -634,15 +948,27 @@ def generate_html():
     ''')
 
     for team_number, team_data in tqdm(data['teams'].items()):
-        # Render the template with the data
-        html_content = html_template.render(team_data=team_data)
-
-        # Create HTML output directory if it doesn't exist
-        os.makedirs("html_output", exist_ok=True)
-
-        # Save the HTML content to a file
-        with open(f"html_output/{team_number}.html", "w") as html_file:
-            html_file.write(html_content)
+        with profiler.phase('render_html', sample=True):
+            # Render the template with the data
+            html_content = html_template.render(team_data=team_data)
+
+            # Create HTML output directory if it doesn't exist
+            os.makedirs("html_output", exist_ok=True)
+
+            # Save the HTML content to a file
+            with open(f"html_output/{team_number}.html", "w") as html_file:
+                html_file.write(html_content)
+
+        # Save the same team data to the JSON API. Timestamps are left out so
+        # that the file only changes when the team's data does.
+        with profiler.phase('render_json', sample=True):
+            write_api_json(f"html_output/api/teams/{team_number}.json", {
+                'team_number': team_data['team_number'],
+                'team_name': team_data['team_name'],
+                'rookie_year': team_data['rookie_year'],
+                'summaries': team_data['summaries'],
+                'awards': team_data['awards'],
+            })
 
     # Create an all hexfecta page to list all teams that have at least 1 hexfecta
     all_hexfecta_template = Template('''
@@ -667,9 +993,14 @@ def generate_html():
     </body>
     </html>
     ''')
-    html_content = all_hexfecta_template.render(data=data)
-    with open("html_output/all_hexfecta.html", "w") as f:
-        f.write(html_content)
+    with profiler.phase('render_html', sample=True):
+        html_content = all_hexfecta_template.render(data=data)
+        with open("html_output/all_hexfecta.html", "w") as f:
+            f.write(html_content)
+    with profiler.phase('render_json', sample=True):
+        write_api_json("html_output/api/all_hexfecta.json", {
+            'teams': data['summaries']['all_by_hexfectas'],
+        })
 
     # Create a top page to list top teams
     top_template = Template('''
@@ -694,9 +1025,14 @@ def generate_html():
     </body>
     </html>
     ''')
-    html_content = top_template.render(data=data)
-    with open("html_output/top.html", "w") as f:
-        f.write(html_content)
+    with profiler.phase('render_html', sample=True):
+        html_content = top_template.render(data=data)
+        with open("html_output/top.html", "w") as f:
+            f.write(html_content)
+    with profiler.phase('render_json', sample=True):
+        write_api_json("html_output/api/top.json", {
+            'teams': data['summaries']['top_n_hexfectas'],
+        })
 
     # Create an index HTML page to list all teams
     index_template = Template('''
@@ -721,9 +1057,25 @@ def generate_html():
     </body>
     </html>
     ''')
-    html_content = index_template.render(data=data)
-    with open("html_output/index.html", "w") as index_file:
-        index_file.write(html_content)
+    with profiler.phase('render_html', sample=True):
+        html_content = index_template.render(data=data)
+        with open("html_output/index.html", "w") as index_file:
+            index_file.write(html_content)
+    with profiler.phase('render_json', sample=True):
+        write_api_json("html_output/api/index.json", {
+            'teams': [
+                {
+                    'team_number': team_data['team_number'],
+                    'team_name': team_data['team_name'],
+                    'rookie_year': team_data['rookie_year'],
+                    'hexfectas': team_data['summaries']['hexfectas'],
+                }
+                for team_data in data['teams'].values()
+            ],
+        })
+        write_api_json("html_output/api/last_updated.json", {
+            'last_updated': data['last_updated'],
+        })
 
 
 def main():
@@ -731,8 +1083,12 @@ def main():
     if use_ipv4_only is not None and use_ipv4_only.lower() in ('true', '1', 't', 'y', 'yes'):
         requests.packages.urllib3.util.connection.HAS_IPV6 = False
 
-    scrape_and_summarize()
-    generate_html()
+    profiler = Profiler(os.getenv('PROFILE_OUTPUT_DIR'))
+    try:
+        scrape_and_summarize(profiler)
+        generate_html(profiler)
+    finally:
+        profiler.write()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file